@@ -0,0 +1,132 @@
+"""
+OpenAI Batch API integration for bulk clip idea jobs.
+Requests are uploaded as JSONL and processed within a 24h window at lower cost.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import orjson
+
+from openai_client import (
+    OpenAIError,
+    build_completion_params,
+    build_messages,
+    get_client,
+    parse_clip_ideas,
+)
+from validators import ClipIdea
+
+# Batch API settings
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+
+
+@dataclass
+class BatchJobResult:
+    """Status and, once finished, per-video results of a batch job."""
+    batch_id: str
+    status: str
+    ideas: Dict[str, List[ClipIdea]] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+def _build_batch_jsonl(segments_by_video: Dict[str, str]) -> bytes:
+    """Build the JSONL input file, one chat completion request per video."""
+    lines = []
+    for video_id, segments_json in segments_by_video.items():
+        lines.append(orjson.dumps({
+            "custom_id": video_id,
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": build_completion_params(build_messages(segments_json))
+        }))
+    return b"\n".join(lines)
+
+
+async def submit_batch(segments_by_video: Dict[str, str]) -> str:
+    """
+    Submit clip idea requests for several videos as one batch job.
+    
+    Args:
+        segments_by_video: Mapping of video ID to transcript segments JSON
+    
+    Returns:
+        The OpenAI batch ID
+    
+    Raises:
+        OpenAIError: If the upload or batch creation fails
+    """
+    client = get_client()
+    
+    try:
+        input_file = await client.files.create(
+            file=("clip-ideas.jsonl", _build_batch_jsonl(segments_by_video)),
+            purpose="batch"
+        )
+        batch = await client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW
+        )
+    except Exception as e:
+        raise OpenAIError(f"Failed to submit batch: {e}")
+    
+    return batch.id
+
+
+def _parse_batch_line(line: str, result: BatchJobResult) -> None:
+    """Parse one output/error JSONL line into the job result."""
+    item = orjson.loads(line)
+    video_id = item.get("custom_id", "")
+    
+    error = item.get("error")
+    response = item.get("response") or {}
+    if error or response.get("status_code") != 200:
+        message = (error or {}).get("message") or f"HTTP {response.get('status_code')}"
+        result.errors[video_id] = message
+        return
+    
+    try:
+        content = response["body"]["choices"][0]["message"]["content"]
+        valid_ideas, _ = parse_clip_ideas(content or "")
+    except (KeyError, IndexError, TypeError, OpenAIError) as e:
+        result.errors[video_id] = f"Invalid batch response: {e}"
+        return
+    
+    if not valid_ideas:
+        result.errors[video_id] = "No valid clip ideas in response"
+        return
+    result.ideas[video_id] = valid_ideas
+
+
+async def get_batch_results(batch_id: str) -> BatchJobResult:
+    """
+    Poll a batch job and collect its results once it has completed.
+    
+    Raises:
+        OpenAIError: If the batch cannot be retrieved or downloaded
+    """
+    client = get_client()
+    
+    try:
+        batch = await client.batches.retrieve(batch_id)
+        result = BatchJobResult(batch_id=batch.id, status=batch.status)
+        
+        if batch.status != "completed":
+            return result
+        
+        file_ids: List[Optional[str]] = [batch.output_file_id, batch.error_file_id]
+        for file_id in file_ids:
+            if not file_id:
+                continue
+            content = await client.files.content(file_id)
+            for line in content.text.splitlines():
+                if line.strip():
+                    _parse_batch_line(line, result)
+    except OpenAIError:
+        raise
+    except Exception as e:
+        raise OpenAIError(f"Failed to fetch batch {batch_id}: {e}")
+    
+    return result
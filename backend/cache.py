@@ -0,0 +1,182 @@
+"""
+Caching for expensive upstream lookups.
+Keeps an in-process TTL cache, optionally persisted to disk (diskcache)
+and shared across workers through Redis when REDIS_URL is set.
+"""
+
+import asyncio
+import logging
+import pickle
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from cachetools import TTLCache
+from diskcache import Cache
+
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Log hit/miss counters every this many lookups
+STATS_LOG_INTERVAL = 100
+
+
+class ResultCache:
+    """Async TTL cache that single-flights concurrent misses for the same key."""
+    
+    def __init__(
+        self,
+        namespace: str,
+        maxsize: int,
+        ttl: int,
+        disk_dir: Optional[str] = None,
+        memory_ttl: Optional[int] = None
+    ):
+        """
+        Args:
+            namespace: Prefix for this cache's Redis keys
+            maxsize: Maximum entries kept in memory
+            ttl: Lifetime of disk and Redis entries, in seconds
+            disk_dir: Directory for the diskcache tier, or None to disable it
+            memory_ttl: Lifetime of in-memory entries; defaults to ttl
+        """
+        self._namespace = namespace
+        self._ttl = ttl
+        self._local: TTLCache = TTLCache(maxsize=maxsize, ttl=memory_ttl or ttl)
+        self._disk: Optional[Cache] = None
+        if disk_dir:
+            try:
+                self._disk = Cache(disk_dir)
+            except Exception as e:
+                logger.warning(f"Disk cache unavailable at {disk_dir}, continuing without it: {e}")
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._hits = 0
+        self._misses = 0
+    
+    def _redis_key(self, key: str) -> str:
+        """Build the Redis key for a cache entry."""
+        return f"cache:{self._namespace}:{key}"
+    
+    def _record(self, hit: bool) -> None:
+        """Count a lookup and periodically log the hit rate."""
+        if hit:
+            self._hits += 1
+        else:
+            self._misses += 1
+        
+        total = self._hits + self._misses
+        if total % STATS_LOG_INTERVAL == 0:
+            logger.info(f"{self._namespace} cache: {self._hits} hits, {self._misses} misses")
+    
+    async def _disk_call(self, action: str, method: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a diskcache call off the event loop; failures are logged and return None."""
+        try:
+            # diskcache is synchronous (SQLite), so keep it off the event loop
+            return await asyncio.to_thread(method, *args, **kwargs)
+        except Exception as e:
+            logger.warning(f"Disk cache {action} failed for {args[0]}: {e}")
+            return None
+    
+    async def _get_shared(self, key: str) -> Optional[Any]:
+        """Look a key up on disk, then in Redis."""
+        if self._disk is not None:
+            value = await self._disk_call("read", self._disk.get, key)
+            if value is not None:
+                return value
+        
+        redis = get_redis()
+        if redis is None:
+            return None
+        
+        try:
+            raw = await redis.get(self._redis_key(key))
+        except Exception as e:
+            logger.warning(f"Redis cache read failed for {key}: {e}")
+            return None
+        if raw is None:
+            return None
+        
+        try:
+            value = pickle.loads(raw)
+        except Exception as e:
+            logger.warning(f"Redis cache entry for {key} could not be unpickled: {e}")
+            return None
+        
+        if self._disk is not None:
+            await self._disk_call("write", self._disk.set, key, value, expire=self._ttl)
+        return value
+    
+    async def get(self, key: str) -> Optional[Any]:
+        """Get a cached value from memory, disk, then Redis, or None on a miss."""
+        value = self._local.get(key)
+        if value is None:
+            value = await self._get_shared(key)
+            if value is not None:
+                self._local[key] = value
+        
+        self._record(value is not None)
+        return value
+    
+    async def set(self, key: str, value: Any) -> None:
+        """Store a value in memory and in each configured shared tier."""
+        self._local[key] = value
+        
+        if self._disk is not None:
+            await self._disk_call("write", self._disk.set, key, value, expire=self._ttl)
+        
+        redis = get_redis()
+        if redis is None:
+            return
+        
+        try:
+            await redis.set(self._redis_key(key), pickle.dumps(value), ex=self._ttl)
+        except Exception as e:
+            logger.warning(f"Redis cache write failed for {key}: {e}")
+    
+    async def delete(self, key: str) -> None:
+        """Remove a key from every tier."""
+        self._local.pop(key, None)
+        
+        if self._disk is not None:
+            await self._disk_call("delete", self._disk.delete, key)
+        
+        redis = get_redis()
+        if redis is None:
+            return
+        
+        try:
+            await redis.delete(self._redis_key(key))
+        except Exception as e:
+            logger.warning(f"Redis cache delete failed for {key}: {e}")
+    
+    async def _compute_and_set(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Compute a missing value and store it in every tier."""
+        value = await compute()
+        # None reads back as a miss, so storing it would only cost writes
+        if value is not None:
+            await self.set(key, value)
+        return value
+    
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value for key, computing and storing it on a miss.
+        
+        Concurrent misses for the same key share a single computation.
+        A None result is returned but not cached.
+        """
+        value = await self.get(key)
+        if value is not None:
+            return value
+        
+        future = self._inflight.get(key)
+        if future is None:
+            # Another caller's computation may have finished while get() awaited
+            value = self._local.get(key)
+            if value is not None:
+                return value
+            
+            future = asyncio.ensure_future(self._compute_and_set(key, compute))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        # One caller disconnecting mustn't cancel the computation for the others
+        return await asyncio.shield(future)
@@ -0,0 +1,37 @@
+"""
+Gunicorn configuration for production deployments.
+Runs one Uvicorn worker (and event loop) per process.
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+# Read .env before the app does so REDIS_URL can size the worker pool
+load_dotenv()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+
+def _default_workers() -> int:
+    """
+    Pick the worker count when WEB_CONCURRENCY isn't set.
+    
+    Without Redis, rate limits, caches and single-flight are per process,
+    so extra workers would multiply DAILY_LIMIT_PER_IP; run just one.
+    """
+    if not os.getenv("REDIS_URL"):
+        return 1
+    
+    # I/O-bound workload: 2 workers per usable core (respects CPU affinity)
+    return len(os.sched_getaffinity(0)) * 2
+
+
+workers = int(os.getenv("WEB_CONCURRENCY") or _default_workers())
+
+# UvicornWorker picks uvloop + httptools automatically (uvicorn[standard])
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Transcript + OpenAI calls can take tens of seconds under load
+timeout = 120
+graceful_timeout = 30
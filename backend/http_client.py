@@ -0,0 +1,42 @@
+"""
+Shared HTTP client for upstream requests (YouTube, OpenAI).
+One pooled HTTP/2 client per process so connections and TLS sessions are reused.
+Responses are requested compressed; httpx adds br to Accept-Encoding when brotli is installed.
+"""
+
+from typing import Optional
+
+import httpx
+
+# Connection pool limits for all upstream hosts combined
+MAX_CONNECTIONS = 200
+MAX_KEEPALIVE_CONNECTIONS = 100
+
+# Idle connections stay open this long (httpx defaults to 5s)
+KEEPALIVE_EXPIRY = 30.0  # seconds
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY
+            )
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client, if one was created."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
@@ -3,27 +3,39 @@ FastAPI backend for YouTube Clip Suggestion Extension.
 Provides /api/clip-ideas endpoint for generating clip ideas.
 """
 
-import json
+import asyncio
 import logging
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-from openai_client import OpenAIError, generate_clip_ideas
-from rate_limiter import rate_limiter
-from transcript import TranscriptNotAvailable, fetch_transcript, segments_to_json
-
-# Load environment variables
+# Load environment variables before local modules read their settings
 load_dotenv()
 
+from batch_client import get_batch_results, submit_batch
+from http_client import close_http_client
+from openai_client import OpenAIError, generate_clip_ideas, reset_client, stream_clip_ideas
+from rate_limiter import rate_limiter
+from redis_client import close_redis
+from transcript import (
+    TranscriptNotAvailable,
+    TranscriptResult,
+    fetch_transcript,
+    fit_segments_to_token_budget,
+    run_tokenizer_loader,
+    segments_to_json,
+)
+from validators import ClipIdea
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Clip Suggestion API",
@@ -31,6 +43,16 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# In-flight pipelines keyed by (videoId, languageHint)
+_inflight: Dict[Tuple[str, Optional[str]], asyncio.Future] = {}
+
+# Transcripts longer than this are serialized in a worker thread
+OFFLOAD_SEGMENTS_THRESHOLD = 500
+
+# Batch processing limits
+MAX_BATCH_SIZE = 20
+BATCH_CONCURRENCY = 10
+
 # Configure CORS
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
 allowed_origins = [origin.strip() for origin in allowed_origins]
@@ -39,7 +61,7 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
-    allow_methods=["POST", "OPTIONS"],
+    allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
 )
 
@@ -85,6 +107,48 @@ class ErrorResponse(BaseModel):
     message: str
 
 
+class ServiceStatus(BaseModel):
+    """Service identification for the root health check."""
+    status: str
+    service: str
+
+
+class HealthStatus(BaseModel):
+    """Health check response."""
+    status: str
+
+
+class BatchClipIdeaRequest(BaseModel):
+    """Request body for batch clip ideas endpoint."""
+    videos: List[ClipIdeaRequest] = Field(..., description="Videos to process")
+
+
+class BatchItemResult(BaseModel):
+    """Outcome for one video in a batch."""
+    videoId: str
+    result: Optional[SuccessResponse] = None
+    error: Optional[ErrorResponse] = None
+
+
+class BatchResponse(BaseModel):
+    """Batch response with one result per requested video."""
+    results: List[BatchItemResult]
+
+
+class BatchJobItem(BaseModel):
+    """Outcome for one video in an OpenAI Batch API job."""
+    videoId: str
+    ideas: List[ClipIdeaResponse] = []
+    error: Optional[ErrorResponse] = None
+
+
+class BatchJobResponse(BaseModel):
+    """Status of an OpenAI Batch API job, with results once completed."""
+    batchId: Optional[str]
+    status: str
+    results: List[BatchJobItem]
+
+
 # --- Middleware ---
 
 @app.middleware("http")
@@ -108,6 +172,33 @@ async def validate_client_header(request: Request, call_next):
     return await call_next(request)
 
 
+# --- Lifecycle ---
+
+_background_tasks: List[asyncio.Task] = []
+
+
+@app.on_event("startup")
+async def startup():
+    """Start background maintenance tasks."""
+    _background_tasks.append(asyncio.create_task(rate_limiter.run_sweeper()))
+    
+    # tiktoken downloads encodings on first use; until then requests estimate tokens
+    model = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+    _background_tasks.append(asyncio.create_task(run_tokenizer_loader(model)))
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background tasks and release shared upstream clients."""
+    for task in _background_tasks:
+        task.cancel()
+    _background_tasks.clear()
+    
+    reset_client()
+    await close_http_client()
+    await close_redis()
+
+
 # --- Helper Functions ---
 
 def get_client_ip(request: Request) -> str:
@@ -121,41 +212,15 @@ def get_client_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
 
-# --- Endpoints ---
-
-@app.get("/")
-async def root():
-    """Health check endpoint."""
-    return {"status": "ok", "service": "clip-suggestion-api"}
-
-
-@app.get("/health")
-async def health():
-    """Health check endpoint."""
-    return {"status": "healthy"}
-
-
-@app.post(
-    "/api/clip-ideas",
-    response_model=SuccessResponse,
-    responses={
-        400: {"model": ErrorResponse, "description": "Invalid input"},
-        429: {"model": ErrorResponse, "description": "Rate limited"},
-        500: {"model": ErrorResponse, "description": "Server error"},
-    }
-)
-async def generate_clips(request: Request, body: ClipIdeaRequest):
+async def _check_request(client_ip: str, body: ClipIdeaRequest) -> None:
     """
-    Generate clip ideas from a YouTube video.
+    Apply rate limiting and input validation for a single video.
     
-    Requires X-Client header for basic protection.
-    Rate limited to DAILY_LIMIT_PER_IP requests per day.
+    Raises:
+        HTTPException: With an ErrorResponse-shaped detail if rejected
     """
-    # Get client IP for rate limiting
-    client_ip = get_client_ip(request)
-    
     # Check rate limit
-    is_allowed, remaining = rate_limiter.check_and_increment(client_ip)
+    is_allowed, remaining = await rate_limiter.check_and_increment(client_ip)
     if not is_allowed:
         raise HTTPException(
             status_code=429,
@@ -183,35 +248,132 @@ async def generate_clips(request: Request, body: ClipIdeaRequest):
                 "message": "Only 'shorts' mode is supported."
             }
         )
+
+
+def _check_batch_size(body: BatchClipIdeaRequest) -> None:
+    """Reject empty or oversized batches."""
+    if not body.videos or len(body.videos) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "INVALID_INPUT",
+                "message": f"Provide between 1 and {MAX_BATCH_SIZE} videos."
+            }
+        )
+
+
+def _internal_error() -> HTTPException:
+    """Build the generic 500 returned for unexpected failures."""
+    return HTTPException(
+        status_code=500,
+        detail={
+            "error": "INTERNAL_ERROR",
+            "message": "An unexpected error occurred. Please try again."
+        }
+    )
+
+
+async def _load_transcript(body: ClipIdeaRequest) -> TranscriptResult:
+    """
+    Fetch the transcript for a request.
     
+    Raises:
+        HTTPException: TRANSCRIPT_NOT_AVAILABLE if it cannot be fetched,
+            INTERNAL_ERROR on any other failure
+    """
     try:
-        # Fetch transcript
-        transcript_result = fetch_transcript(
+        return await fetch_transcript(
             video_id=body.videoId,
             language_hint=body.languageHint
         )
-        
+    except TranscriptNotAvailable as e:
+        logger.error(f"Transcript error for video {body.videoId}: {str(e)}")
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "TRANSCRIPT_NOT_AVAILABLE",
+                "message": "This video doesn't have an accessible transcript. Try another video."
+            }
+        )
+    except Exception as e:
+        logger.error(f"Unexpected transcript error for video {body.videoId}: {str(e)}", exc_info=True)
+        raise _internal_error()
+
+
+def _serialize_segments(transcript_result: TranscriptResult) -> str:
+    """Serialize a transcript for the prompt, truncated to the token budget."""
+    segments = fit_segments_to_token_budget(
+        transcript_result.segments,
+        model=os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+    )
+    return segments_to_json(segments)
+
+
+async def _build_segments_json(transcript_result: TranscriptResult) -> str:
+    """Serialize a transcript, off the event loop when it is large."""
+    # Tokenizing and encoding thousands of segments would stall other requests
+    if len(transcript_result.segments) > OFFLOAD_SEGMENTS_THRESHOLD:
+        return await asyncio.to_thread(_serialize_segments, transcript_result)
+    return _serialize_segments(transcript_result)
+
+
+def _to_idea_response(idea: ClipIdea) -> ClipIdeaResponse:
+    """Convert a validated clip idea to its response model."""
+    return ClipIdeaResponse(
+        start_seconds=idea.start_seconds,
+        end_seconds=idea.end_seconds,
+        start=idea.start,
+        end=idea.end,
+        hook=idea.hook,
+        why=idea.why,
+        suggested_caption=idea.suggested_caption
+    )
+
+
+def _to_idea_responses(ideas: List[ClipIdea]) -> List[ClipIdeaResponse]:
+    """Convert validated clip ideas to response models."""
+    return [_to_idea_response(idea) for idea in ideas]
+
+
+async def _process_video(client_ip: str, body: ClipIdeaRequest) -> SuccessResponse:
+    """
+    Run the transcript + OpenAI pipeline for a single video.
+    
+    Concurrent requests for the same video and language share one
+    in-flight pipeline; each caller is still rate limited.
+    
+    Raises:
+        HTTPException: With an ErrorResponse-shaped detail on any failure
+    """
+    await _check_request(client_ip, body)
+    
+    key = (body.videoId, body.languageHint)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_run_pipeline(body))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    
+    # Shield so one caller disconnecting doesn't cancel the shared work
+    return await asyncio.shield(task)
+
+
+async def _run_pipeline(body: ClipIdeaRequest) -> SuccessResponse:
+    """Fetch the transcript and generate clip ideas for a validated request."""
+    # Fetch transcript
+    transcript_result = await _load_transcript(body)
+    
+    try:
         # Convert segments to JSON for OpenAI
-        segments_json = json.dumps(segments_to_json(transcript_result.segments))
+        segments_json = await _build_segments_json(transcript_result)
         
         # Generate clip ideas
-        ideas = generate_clip_ideas(segments_json)
+        ideas = await generate_clip_ideas(segments_json)
         
         # Build response
         return SuccessResponse(
             videoId=body.videoId,
-            ideas=[
-                ClipIdeaResponse(
-                    start_seconds=idea.start_seconds,
-                    end_seconds=idea.end_seconds,
-                    start=idea.start,
-                    end=idea.end,
-                    hook=idea.hook,
-                    why=idea.why,
-                    suggested_caption=idea.suggested_caption
-                )
-                for idea in ideas
-            ],
+            ideas=_to_idea_responses(ideas),
             meta=MetaInfo(
                 transcript_language=transcript_result.language,
                 transcript_source="youtube-direct",
@@ -219,37 +381,208 @@ async def generate_clips(request: Request, body: ClipIdeaRequest):
             )
         )
     
-    except TranscriptNotAvailable as e:
-        logger.error(f"Transcript error for video {body.videoId}: {str(e)}")
+    except OpenAIError as e:
+        logger.error(f"OpenAI error for video {body.videoId}: {str(e)}")
         raise HTTPException(
-            status_code=400,
+            status_code=500,
             detail={
-                "error": "TRANSCRIPT_NOT_AVAILABLE",
-                "message": "This video doesn't have an accessible transcript. Try another video."
+                "error": "OPENAI_ERROR",
+                "message": f"Failed to generate ideas: {str(e)}"
             }
         )
     
+    except Exception as e:
+        logger.error(f"Unexpected error for video {body.videoId}: {str(e)}", exc_info=True)
+        raise _internal_error()
+
+
+# --- Endpoints ---
+
+@app.get("/", response_model=ServiceStatus)
+async def root():
+    """Health check endpoint."""
+    return {"status": "ok", "service": "clip-suggestion-api"}
+
+
+@app.get("/health", response_model=HealthStatus)
+async def health():
+    """Health check endpoint."""
+    return {"status": "healthy"}
+
+
+@app.post(
+    "/api/clip-ideas",
+    response_model=SuccessResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid input"},
+        429: {"model": ErrorResponse, "description": "Rate limited"},
+        500: {"model": ErrorResponse, "description": "Server error"},
+    }
+)
+async def generate_clips(request: Request, body: ClipIdeaRequest):
+    """
+    Generate clip ideas from a YouTube video.
+    
+    Requires X-Client header for basic protection.
+    Rate limited to DAILY_LIMIT_PER_IP requests per day.
+    """
+    return await _process_video(get_client_ip(request), body)
+
+
+@app.post(
+    "/api/clip-ideas/stream",
+    responses={
+        200: {"content": {"application/x-ndjson": {}}, "description": "One clip idea per line"},
+        400: {"model": ErrorResponse, "description": "Invalid input"},
+        429: {"model": ErrorResponse, "description": "Rate limited"},
+    }
+)
+async def stream_clips(request: Request, body: ClipIdeaRequest):
+    """
+    Stream clip ideas as newline-delimited JSON, one idea per line.
+    
+    Ideas are sent as soon as the model finishes each one. If generation
+    fails mid-stream, the last line is an ErrorResponse object.
+    """
+    await _check_request(get_client_ip(request), body)
+    transcript_result = await _load_transcript(body)
+    segments_json = await _build_segments_json(transcript_result)
+    
+    async def ndjson_lines():
+        try:
+            async for idea in stream_clip_ideas(segments_json):
+                yield _to_idea_response(idea).model_dump_json() + "\n"
+        except OpenAIError as e:
+            logger.error(f"OpenAI error for video {body.videoId}: {str(e)}")
+            error = ErrorResponse(error="OPENAI_ERROR", message=f"Failed to generate ideas: {str(e)}")
+            yield error.model_dump_json() + "\n"
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+@app.post(
+    "/api/clip-ideas/batch",
+    response_model=BatchResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid input"},
+    }
+)
+async def generate_clips_batch(request: Request, body: BatchClipIdeaRequest):
+    """
+    Generate clip ideas for several YouTube videos concurrently.
+    
+    Each video counts against the daily rate limit. Failures are
+    reported per video instead of failing the whole batch.
+    """
+    _check_batch_size(body)
+    
+    client_ip = get_client_ip(request)
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def process_one(video: ClipIdeaRequest) -> BatchItemResult:
+        async with semaphore:
+            try:
+                result = await _process_video(client_ip, video)
+            except HTTPException as e:
+                return BatchItemResult(videoId=video.videoId, error=ErrorResponse(**e.detail))
+            except Exception as e:
+                logger.error(f"Unexpected batch error for video {video.videoId}: {str(e)}", exc_info=True)
+                return BatchItemResult(videoId=video.videoId, error=ErrorResponse(**_internal_error().detail))
+        return BatchItemResult(videoId=video.videoId, result=result)
+    
+    results = await asyncio.gather(*[process_one(video) for video in body.videos])
+    return BatchResponse(results=results)
+
+
+@app.post(
+    "/api/clip-ideas/batch/jobs",
+    response_model=BatchJobResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid input"},
+        500: {"model": ErrorResponse, "description": "Server error"},
+    }
+)
+async def submit_clips_batch_job(request: Request, body: BatchClipIdeaRequest):
+    """
+    Submit several videos as an OpenAI Batch API job.
+    
+    Cheaper than the live endpoints but completes asynchronously (within
+    24h); poll GET /api/clip-ideas/batch/{batch_id} for results.
+    """
+    _check_batch_size(body)
+    
+    client_ip = get_client_ip(request)
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    segments_by_video: Dict[str, str] = {}
+    failed: List[BatchJobItem] = []
+    
+    async def prepare_one(video: ClipIdeaRequest) -> None:
+        try:
+            async with semaphore:
+                await _check_request(client_ip, video)
+                transcript_result = await _load_transcript(video)
+            segments_by_video[video.videoId] = await _build_segments_json(transcript_result)
+        except HTTPException as e:
+            failed.append(BatchJobItem(videoId=video.videoId, error=ErrorResponse(**e.detail)))
+        except Exception as e:
+            logger.error(f"Unexpected batch job error for video {video.videoId}: {str(e)}", exc_info=True)
+            failed.append(BatchJobItem(videoId=video.videoId, error=ErrorResponse(**_internal_error().detail)))
+    
+    await asyncio.gather(*[prepare_one(video) for video in body.videos])
+    
+    if not segments_by_video:
+        return BatchJobResponse(batchId=None, status="failed", results=failed)
+    
+    try:
+        batch_id = await submit_batch(segments_by_video)
     except OpenAIError as e:
-        logger.error(f"OpenAI error for video {body.videoId}: {str(e)}")
+        logger.error(f"OpenAI batch submission error: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail={
                 "error": "OPENAI_ERROR",
-                "message": f"Failed to generate ideas: {str(e)}"
+                "message": f"Failed to submit batch: {str(e)}"
             }
         )
     
-    except Exception as e:
-        logger.error(f"Unexpected error for video {body.videoId}: {str(e)}", exc_info=True)
+    return BatchJobResponse(batchId=batch_id, status="submitted", results=failed)
+
+
+@app.get(
+    "/api/clip-ideas/batch/{batch_id}",
+    response_model=BatchJobResponse,
+    responses={
+        500: {"model": ErrorResponse, "description": "Server error"},
+    }
+)
+async def get_clips_batch_job(batch_id: str):
+    """Poll an OpenAI Batch API job and return its results once completed."""
+    try:
+        job = await get_batch_results(batch_id)
+    except OpenAIError as e:
+        logger.error(f"OpenAI batch retrieval error for {batch_id}: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail={
-                "error": "INTERNAL_ERROR",
-                "message": "An unexpected error occurred. Please try again."
+                "error": "OPENAI_ERROR",
+                "message": f"Failed to fetch batch: {str(e)}"
             }
         )
+    
+    results = [
+        BatchJobItem(videoId=video_id, ideas=_to_idea_responses(ideas))
+        for video_id, ideas in job.ideas.items()
+    ]
+    results.extend(
+        BatchJobItem(
+            videoId=video_id,
+            error=ErrorResponse(error="OPENAI_ERROR", message=f"Failed to generate ideas: {message}")
+        )
+        for video_id, message in job.errors.items()
+    )
+    return BatchJobResponse(batchId=job.batch_id, status=job.status, results=results)
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", http="httptools")
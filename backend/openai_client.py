@@ -3,13 +3,21 @@ OpenAI integration for generating clip ideas.
 Uses strict JSON output prompting.
 """
 
-import json
 import os
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
 
-from openai import OpenAI
+import orjson
+from openai import AsyncOpenAI
 
-from validators import ClipIdea, validate_ideas
+from http_client import get_http_client
+from validators import (
+    IDEA_COUNT,
+    MAX_CLIP_DURATION,
+    MIN_CLIP_DURATION,
+    ClipIdea,
+    validate_clip_idea,
+    validate_ideas,
+)
 
 
 class OpenAIError(Exception):
@@ -17,17 +25,54 @@ class OpenAIError(Exception):
     pass
 
 
+# Completion settings; IDEA_COUNT ideas of short strings fit well within MAX_TOKENS
+TEMPERATURE = 0.3
+MAX_TOKENS = 900
+
+# Structured output schema, enforced server-side so replies are always valid JSON
+IDEA_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "start_seconds": {"type": "integer"},
+        "end_seconds": {"type": "integer"},
+        "hook": {"type": "string"},
+        "why": {"type": "string"},
+        "suggested_caption": {"type": "string"}
+    },
+    "required": ["start_seconds", "end_seconds", "hook", "why", "suggested_caption"],
+    "additionalProperties": False
+}
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "clip_ideas",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "ideas": {"type": "array", "items": IDEA_SCHEMA}
+            },
+            "required": ["ideas"],
+            "additionalProperties": False
+        }
+    }
+}
+
+# Nesting depth of an idea object within {"ideas": [ {...} ]}
+_IDEA_DEPTH = 3
+
 # System prompt for the AI
 SYSTEM_PROMPT = """You are a senior video editor and viral clip strategist. You output strict JSON only."""
 
 # User prompt template
 USER_PROMPT_TEMPLATE = """You will receive a YouTube transcript with timestamps.
-Generate EXACTLY 5 clip ideas for short-form content.
+Generate EXACTLY {idea_count} clip ideas for short-form content.
 
 Rules:
 - Output MUST be valid JSON only. No markdown. No extra text.
 - Each idea must use timestamps that exist in the transcript.
-- Each clip duration must be between 25 and 70 seconds.
+- Each clip duration must be between {min_duration} and {max_duration} seconds.
 - Prefer moments with: strong opinions, surprising statements, clear takeaways, emotional beats, punchy stories.
 - Avoid greetings, ads, sponsor segments, and housekeeping.
 - If language is non-English, still write hook/why/caption in English.
@@ -36,8 +81,8 @@ Output schema:
 {{
   "ideas": [
     {{
-      "start_seconds": number,
-      "end_seconds": number,
+      "start_seconds": integer,
+      "end_seconds": integer,
       "hook": string,
       "why": string,
       "suggested_caption": string
@@ -45,33 +90,46 @@ Output schema:
   ]
 }}
 
-Transcript segments (JSON array, each item has t=start seconds, d=duration seconds, text):
+Transcript segments (JSON array of [start_seconds, duration_seconds, text] tuples):
 {segments_json}"""
 
-# Retry prompt for invalid JSON
-RETRY_PROMPT = """Your previous response was not valid JSON or didn't match the schema.
-Fix the output to valid JSON matching this exact schema:
-{{
-  "ideas": [
-    {{
-      "start_seconds": number,
-      "end_seconds": number,
-      "hook": string,
-      "why": string,
-      "suggested_caption": string
-    }}
-  ]
-}}
+# Retry prompt when too few ideas pass validation (the schema itself is enforced)
+RETRY_PROMPT = f"""Some of your clip ideas failed validation.
+Return EXACTLY {IDEA_COUNT} ideas where every idea has:
+- integer start_seconds less than end_seconds, both timestamps that exist in the transcript
+- a clip duration (end_seconds - start_seconds) between {MIN_CLIP_DURATION} and {MAX_CLIP_DURATION} seconds
+- a non-empty hook and why"""
+
 
-Return ONLY valid JSON. No markdown code blocks. No extra text."""
+# Shared client, created on first use and reused across requests
+_client: Optional[AsyncOpenAI] = None
+_client_api_key: Optional[str] = None
 
 
-def _get_client() -> OpenAI:
-    """Get OpenAI client with API key from environment."""
+def get_client() -> AsyncOpenAI:
+    """Get the shared OpenAI client for the API key from environment."""
+    global _client, _client_api_key
+    
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise OpenAIError("OPENAI_API_KEY not configured")
-    return OpenAI(api_key=api_key)
+    
+    # Reuse the cached client (and its connection pool) unless the key changed
+    if _client is None or _client_api_key != api_key:
+        _client = AsyncOpenAI(
+            api_key=api_key,
+            http_client=get_http_client()
+        )
+        _client_api_key = api_key
+    
+    return _client
+
+
+def reset_client() -> None:
+    """Drop the cached OpenAI client; its HTTP pool is closed with http_client."""
+    global _client, _client_api_key
+    _client = None
+    _client_api_key = None
 
 
 def _get_model() -> str:
@@ -79,25 +137,139 @@ def _get_model() -> str:
     return os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
 
 
+def _find_json_object(content: str) -> Optional[str]:
+    """Return the outermost balanced {...} span in content, if any."""
+    start = content.find('{')
+    if start == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    escape = False
+    
+    for i in range(start, len(content)):
+        ch = content[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return content[start:i + 1]
+    
+    return None
+
+
 def _parse_response(content: str) -> dict:
-    """Parse JSON response from OpenAI."""
-    # Strip markdown code blocks if present
-    content = content.strip()
-    if content.startswith("```"):
-        # Remove first line (```json or ```)
-        lines = content.split('\n')
-        content = '\n'.join(lines[1:])
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
+    """Parse JSON response from OpenAI, ignoring markdown fences or prose around it."""
+    json_text = _find_json_object(content)
+    if json_text is None:
+        raise OpenAIError("Invalid JSON response: no JSON object found")
     
     try:
-        return json.loads(content)
-    except json.JSONDecodeError as e:
+        return orjson.loads(json_text)
+    except orjson.JSONDecodeError as e:
         raise OpenAIError(f"Invalid JSON response: {e}")
 
 
-def generate_clip_ideas(
+class _IdeaStreamParser:
+    """Incrementally extracts idea objects from a streamed {"ideas": [...]} response."""
+    
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._capture: Optional[List[str]] = None
+    
+    def feed(self, chunk: str) -> List[dict]:
+        """Consume a chunk of content and return any ideas it completed."""
+        ideas = []
+        
+        for ch in chunk:
+            if self._capture is not None:
+                self._capture.append(ch)
+            
+            # Braces inside string values don't affect nesting
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+                if self._depth == _IDEA_DEPTH and ch == '{':
+                    self._capture = ['{']
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == _IDEA_DEPTH - 1 and self._capture is not None:
+                    try:
+                        ideas.append(orjson.loads(''.join(self._capture)))
+                    except orjson.JSONDecodeError:
+                        pass
+                    self._capture = None
+        
+        return ideas
+
+
+def build_messages(segments_json: str) -> List[dict]:
+    """Build the initial chat messages for a transcript."""
+    user_prompt = USER_PROMPT_TEMPLATE.format(
+        segments_json=segments_json,
+        idea_count=IDEA_COUNT,
+        min_duration=MIN_CLIP_DURATION,
+        max_duration=MAX_CLIP_DURATION
+    )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def build_completion_params(messages: List[dict]) -> dict:
+    """Build chat completion parameters, shared by live and batch requests."""
+    return {
+        "model": _get_model(),
+        "messages": messages,
+        "temperature": TEMPERATURE,
+        "max_tokens": MAX_TOKENS,
+        "response_format": RESPONSE_FORMAT
+    }
+
+
+def parse_clip_ideas(content: str) -> Tuple[List[ClipIdea], bool]:
+    """
+    Parse and validate clip ideas from a completion's content.
+    
+    Returns:
+        Tuple of (valid_ideas, needs_regeneration)
+        
+    Raises:
+        OpenAIError: If the content is not JSON with an 'ideas' list
+    """
+    parsed = _parse_response(content)
+    
+    raw_ideas = parsed.get("ideas", [])
+    if not isinstance(raw_ideas, list):
+        raise OpenAIError("Response 'ideas' is not a list")
+    
+    return validate_ideas(raw_ideas)
+
+
+async def generate_clip_ideas(
     segments_json: str,
     max_retries: int = 1
 ) -> List[ClipIdea]:
@@ -109,74 +281,102 @@ def generate_clip_ideas(
         max_retries: Number of retries for invalid responses
         
     Returns:
-        List of 5 validated ClipIdea objects
+        List of IDEA_COUNT validated ClipIdea objects
         
     Raises:
         OpenAIError: If API call fails or validation fails after retries
     """
-    client = _get_client()
-    model = _get_model()
-    
-    # Build user prompt
-    user_prompt = USER_PROMPT_TEMPLATE.format(segments_json=segments_json)
-    
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": user_prompt}
-    ]
+    client = get_client()
+    messages = build_messages(segments_json)
     
     retries = 0
     last_error: Optional[str] = None
     
     while retries <= max_retries:
         try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=2000
+            response = await client.chat.completions.create(
+                **build_completion_params(messages)
             )
             
             content = response.choices[0].message.content
             if not content:
                 raise OpenAIError("Empty response from OpenAI")
             
-            # Parse JSON
-            parsed = _parse_response(content)
-            
-            # Extract ideas
-            raw_ideas = parsed.get("ideas", [])
-            if not isinstance(raw_ideas, list):
-                raise OpenAIError("Response 'ideas' is not a list")
-            
-            # Validate ideas
-            valid_ideas, needs_regeneration = validate_ideas(raw_ideas)
+            # Parse and validate ideas
+            valid_ideas, needs_regeneration = parse_clip_ideas(content)
             
-            if not needs_regeneration and len(valid_ideas) == 5:
+            if not needs_regeneration and len(valid_ideas) == IDEA_COUNT:
                 return valid_ideas
             
             # Need to retry
             if retries < max_retries:
                 messages.append({"role": "assistant", "content": content})
                 messages.append({"role": "user", "content": RETRY_PROMPT})
-                last_error = f"Got {len(valid_ideas)} valid ideas, need 5"
+                last_error = f"Got {len(valid_ideas)} valid ideas, need {IDEA_COUNT}"
             else:
                 # Return what we have if at least 3 valid
                 if len(valid_ideas) >= 3:
                     # Pad with duplicates if needed (not ideal but acceptable for MVP)
-                    while len(valid_ideas) < 5:
+                    while len(valid_ideas) < IDEA_COUNT:
                         valid_ideas.append(valid_ideas[-1])
-                    return valid_ideas[:5]
-                raise OpenAIError(f"Could not get 5 valid ideas: {last_error}")
+                    return valid_ideas[:IDEA_COUNT]
+                raise OpenAIError(f"Could not get {IDEA_COUNT} valid ideas: {last_error}")
             
         except OpenAIError:
             raise
         except Exception as e:
             if retries >= max_retries:
                 raise OpenAIError(f"OpenAI API error: {e}")
-            messages.append({"role": "user", "content": RETRY_PROMPT})
+            # Transient API failure: resend the same conversation
             last_error = str(e)
         
         retries += 1
     
     raise OpenAIError("Failed to generate valid clip ideas after retries")
+
+
+async def stream_clip_ideas(segments_json: str) -> AsyncIterator[ClipIdea]:
+    """
+    Stream validated clip ideas as soon as each one is complete.
+    
+    Unlike generate_clip_ideas there is no retry; invalid ideas are skipped.
+    
+    Args:
+        segments_json: JSON string of transcript segments
+        
+    Yields:
+        Up to IDEA_COUNT validated ClipIdea objects
+        
+    Raises:
+        OpenAIError: If the API call fails or yields no valid ideas
+    """
+    client = get_client()
+    params = build_completion_params(build_messages(segments_json))
+    parser = _IdeaStreamParser()
+    emitted = 0
+    
+    try:
+        stream = await client.chat.completions.create(**params, stream=True)
+        async with stream:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                
+                for raw_idea in parser.feed(delta):
+                    idea = validate_clip_idea(raw_idea)
+                    if idea is None:
+                        continue
+                    yield idea
+                    emitted += 1
+                    if emitted == IDEA_COUNT:
+                        return
+    except OpenAIError:
+        raise
+    except Exception as e:
+        raise OpenAIError(f"OpenAI API error: {e}")
+    
+    if emitted == 0:
+        raise OpenAIError("No valid clip ideas in streamed response")
@@ -1,66 +1,104 @@
 """
-In-memory rate limiter for MVP.
-Tracks requests per IP per day.
+Rate limiter tracking requests per IP per day.
+Uses Redis when REDIS_URL is set so limits hold across workers,
+otherwise falls back to an in-memory store for local development.
 """
 
+import asyncio
+import logging
 import os
+from collections import defaultdict
 from datetime import date
-from typing import Dict, Tuple
+from typing import DefaultDict, Tuple
+
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Counters expire a day after first use; the date is also part of the key
+RATE_LIMIT_TTL = 86400
+
+# How often stale in-memory counters are swept
+SWEEP_INTERVAL = 3600  # seconds
 
 
 class RateLimiter:
-    """Simple in-memory rate limiter tracking daily requests per IP."""
+    """Rate limiter tracking daily requests per IP."""
     
     def __init__(self):
-        # Structure: {ip: {date_str: count}}
-        self._requests: Dict[str, Dict[str, int]] = {}
+        # Structure: {(ip, date_str): count} (in-memory fallback only)
+        self._counts: DefaultDict[Tuple[str, str], int] = defaultdict(int)
         self._daily_limit = int(os.getenv("DAILY_LIMIT_PER_IP", "20"))
     
     def _get_today(self) -> str:
         """Get today's date as a string."""
         return date.today().isoformat()
     
-    def _cleanup_old_entries(self, ip: str) -> None:
-        """Remove entries from previous days for this IP."""
+    def _key(self, ip: str, today: str) -> str:
+        """Build the Redis key for an IP's counter on a given day."""
+        return f"ratelimit:{ip}:{today}"
+    
+    def sweep(self) -> None:
+        """Remove in-memory counters from previous days."""
         today = self._get_today()
-        if ip in self._requests:
-            self._requests[ip] = {
-                d: count for d, count in self._requests[ip].items()
-                if d == today
-            }
+        for key in [key for key in self._counts if key[1] != today]:
+            del self._counts[key]
+    
+    async def run_sweeper(self) -> None:
+        """Sweep stale in-memory counters periodically, until cancelled."""
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            self.sweep()
     
-    def check_and_increment(self, ip: str) -> Tuple[bool, int]:
+    async def check_and_increment(self, ip: str) -> Tuple[bool, int]:
         """
         Check if IP is within rate limit and increment counter.
         
+        Falls back to the in-memory counter if Redis is unreachable.
+        
         Returns:
             Tuple of (is_allowed, remaining_requests)
         """
         today = self._get_today()
         
-        # Initialize IP entry if not exists
-        if ip not in self._requests:
-            self._requests[ip] = {}
-        
-        # Cleanup old entries
-        self._cleanup_old_entries(ip)
-        
-        # Get current count for today
-        current_count = self._requests[ip].get(today, 0)
+        redis = get_redis()
+        if redis is not None:
+            # Atomic increment; TTL is only set when the key is first created
+            # (EXPIRE ... NX needs Redis 7.0+)
+            key = self._key(ip, today)
+            try:
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.incr(key)
+                    pipe.expire(key, RATE_LIMIT_TTL, nx=True)
+                    current_count, _ = await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Redis rate limit check failed for {ip}, using in-memory counter: {e}")
+            else:
+                if current_count > self._daily_limit:
+                    return False, 0
+                return True, self._daily_limit - current_count
         
+        # Old days are removed by the periodic sweep, not per request
+        key = (ip, today)
+        current_count = self._counts[key]
         if current_count >= self._daily_limit:
             return False, 0
         
-        # Increment counter
-        self._requests[ip][today] = current_count + 1
-        remaining = self._daily_limit - (current_count + 1)
-        
-        return True, remaining
+        self._counts[key] = current_count + 1
+        return True, self._daily_limit - current_count - 1
     
-    def get_remaining(self, ip: str) -> int:
+    async def get_remaining(self, ip: str) -> int:
         """Get remaining requests for an IP today."""
         today = self._get_today()
-        current_count = self._requests.get(ip, {}).get(today, 0)
+        current_count = self._counts.get((ip, today), 0)
+        
+        redis = get_redis()
+        if redis is not None:
+            try:
+                current_count = int(await redis.get(self._key(ip, today)) or 0)
+            except Exception as e:
+                logger.warning(f"Redis rate limit read failed for {ip}, using in-memory counter: {e}")
+        
         return max(0, self._daily_limit - current_count)
 
 
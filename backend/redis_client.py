@@ -0,0 +1,30 @@
+"""
+Shared Redis connection.
+Used by the rate limiter and caches when REDIS_URL is set.
+"""
+
+import os
+from typing import Optional
+
+from redis.asyncio import Redis
+
+_redis: Optional[Redis] = None
+
+
+def get_redis() -> Optional[Redis]:
+    """Get the shared Redis client, or None if Redis is not configured."""
+    global _redis
+    if _redis is None:
+        redis_url = os.getenv("REDIS_URL")
+        if not redis_url:
+            return None
+        _redis = Redis.from_url(redis_url)
+    return _redis
+
+
+async def close_redis() -> None:
+    """Close the shared Redis connection, if one was opened."""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
@@ -3,12 +3,18 @@ Validation logic for clip ideas.
 Ensures clips meet duration and format requirements.
 """
 
+from dataclasses import dataclass
 from typing import List, Optional, Tuple
-from pydantic import BaseModel
 
 
-class ClipIdea(BaseModel):
-    """A validated clip idea."""
+@dataclass(slots=True, frozen=True)
+class ClipIdea:
+    """
+    A validated clip idea.
+    
+    Only built by validate_clip_idea, which has already checked every field,
+    so a plain dataclass avoids pydantic re-validating them.
+    """
     start_seconds: int
     end_seconds: int
     start: str  # mm:ss format
@@ -23,13 +29,22 @@ class ValidationError(Exception):
     pass
 
 
+# Number of clip ideas each response must contain
+IDEA_COUNT = 5
+
 # Clip duration constraints
 MIN_CLIP_DURATION = 25  # seconds
 MAX_CLIP_DURATION = 70  # seconds
 
 
+# Precomputed mm:ss strings for timestamps within the first 4 hours
+_MMSS = tuple(f"{s // 60:02d}:{s % 60:02d}" for s in range(4 * 3600 + 1))
+
+
 def seconds_to_mmss(seconds: int) -> str:
     """Convert seconds to mm:ss format."""
+    if 0 <= seconds < len(_MMSS):
+        return _MMSS[seconds]
     minutes = seconds // 60
     secs = seconds % 60
     return f"{minutes:02d}:{secs:02d}"
@@ -87,7 +102,7 @@ def validate_ideas(raw_ideas: List[dict]) -> Tuple[List[ClipIdea], bool]:
     
     Returns:
         Tuple of (valid_ideas, needs_regeneration)
-        needs_regeneration is True if we don't have exactly 5 valid ideas
+        needs_regeneration is True if we don't have exactly IDEA_COUNT valid ideas
     """
     valid_ideas: List[ClipIdea] = []
     
@@ -95,13 +110,11 @@ def validate_ideas(raw_ideas: List[dict]) -> Tuple[List[ClipIdea], bool]:
         validated = validate_clip_idea(idea)
         if validated:
             valid_ideas.append(validated)
+            # Only the first IDEA_COUNT are used, so skip validating the rest
+            if len(valid_ideas) == IDEA_COUNT:
+                break
     
-    # We need exactly 5 ideas
-    needs_regeneration = len(valid_ideas) != 5
-    
-    # If we have more than 5, take first 5
-    if len(valid_ideas) > 5:
-        valid_ideas = valid_ideas[:5]
-        needs_regeneration = False
+    # We need exactly IDEA_COUNT ideas
+    needs_regeneration = len(valid_ideas) != IDEA_COUNT
     
     return valid_ideas, needs_regeneration